@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for the repo analyzer container.
+Run with: gunicorn -c gunicorn_conf.py server:app
+"""
+
+bind = "0.0.0.0:8080"
+
+# gevent workers monkey-patch the stdlib before loading the app, so blocking
+# git subprocesses and socket I/O yield instead of stalling other requests.
+# File reads don't yield; server.py runs them on gevent's OS thread pool.
+worker_class = "gevent"
+workers = 2
+worker_connections = 200
+
+# Must outlast the 300s git clone/fetch timeout in server.py
+timeout = 360
@@ -4,61 +4,317 @@ Simple HTTP server for serving cloned repository files
 """
 import os
 import json
+import base64
+import codecs
+import contextlib
+import fcntl
+import shutil
+import stat
+import sys
 import subprocess
-from flask import Flask, jsonify, send_file, request
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from flask import Flask, Response, jsonify, send_file, request, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from pathlib import Path
 
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent = None
+
+# gunicorn's gevent worker patches threading before importing the app, which
+# turns ThreadPoolExecutor workers into greenlets. File reads don't yield to
+# gevent, so they run on the hub's pool of real OS threads instead.
+GEVENT_PATCHED = gevent is not None and gevent_monkey.is_module_patched('threading')
+
+# Locks taken on those OS threads must be real OS locks, not gevent's
+_os_lock = gevent_monkey.get_original('_thread', 'allocate_lock') if GEVENT_PATCHED else threading.Lock
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson for request parsing and jsonify()"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Send orjson's UTF-8 bytes as-is instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 REPO_DIR = "/repos"
 
+# Extra `git clone` flags per clone mode. All modes are shallow single-branch
+# clones; blobless/treeless additionally defer object downloads until needed.
+CLONE_MODES = {
+    'shallow': [],
+    'blobless': ['--filter=blob:none'],
+    'treeless': ['--filter=tree:0'],
+}
+
+# One lock per repo directory: clones of different repos run concurrently,
+# while concurrent /clone calls for the same repo don't clobber each other.
+# _repo_lock adds an flock so this also holds across gunicorn workers.
+_REPO_LOCKS = {}
+_REPO_LOCKS_LOCK = threading.Lock()
+
+# Encoded /files bodies, least recently used first:
+# (owner, repo) -> (HEAD sha, sizes listed, body)
+_FILES_CACHE = OrderedDict()
+_FILES_CACHE_LOCK = threading.Lock()
+FILES_CACHE_SIZE = 32
+
+# Bytes read per chunk when streaming /file JSON responses
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Thread pool size for blocking /analyze reads when io_uring is unavailable
+ANALYZE_READ_WORKERS = 16
+
+# Leading bytes checked for NUL when deciding a file is binary (git's heuristic)
+BINARY_SNIFF_SIZE = 4096
+
+# Max SQEs submitted per io_uring batch in /analyze
+URING_QUEUE_DEPTH = 64
+
+# Upper bound for /analyze max_size; read buffers are allocated at this size per file
+MAX_ANALYZE_SIZE = 256 * 1024
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok"})
 
+def _git(*args, timeout=60):
+    """
+    Run a git command, capturing output.
+    GITHUB_TOKEN (if set) is sent as an auth header for github.com, so the
+    token is never written into a clone's remote URL or .git/config.
+    """
+    cmd = ['git']
+    token = os.environ.get('GITHUB_TOKEN')
+    if token:
+        credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        cmd += ['-c', f'http.https://github.com/.extraHeader=Authorization: Basic {credentials}']
+    return subprocess.run([*cmd, *args], capture_output=True, text=True, timeout=timeout)
+
+def _run_blocking(func, *args):
+    """Call func(*args), on an OS thread under gevent so it doesn't stall the worker's event loop"""
+    if GEVENT_PATCHED:
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+def _make_writable_and_retry(func, path, _exc):
+    """rmtree error handler: unlock read-only entries (e.g. git object files) and retry"""
+    os.chmod(os.path.dirname(path), 0o700)
+    os.chmod(path, 0o700)
+    func(path)
+
+def _remove_tree(path):
+    """Delete a directory tree in-process"""
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=_make_writable_and_retry)
+    else:
+        shutil.rmtree(path, onerror=_make_writable_and_retry)
+
+def _clone_matches(repo_path, repo_url, mode, no_checkout):
+    """True if the clone at repo_path was made from repo_url with the same mode and checkout state"""
+    remote = _git('-C', repo_path, 'remote', 'get-url', 'origin', timeout=10)
+    if remote.returncode != 0 or remote.stdout.strip() != repo_url:
+        return False
+    
+    # Partial clones record their --filter spec; plain shallow clones have none
+    partial_filter = _git('-C', repo_path, 'config', '--get', 'remote.origin.partialclonefilter', timeout=10)
+    expected_filter = CLONE_MODES[mode][0].split('=', 1)[1] if CLONE_MODES[mode] else ''
+    if partial_filter.stdout.strip() != expected_filter:
+        return False
+    
+    # --no-checkout clones have no index until something is checked out
+    has_worktree = os.path.exists(os.path.join(repo_path, '.git', 'index'))
+    return has_worktree != no_checkout
+
+def _ensure_repo(repo_path, repo_url, mode, no_checkout):
+    """
+    Bring repo_path up to date with the default branch of repo_url.
+    An existing clone of the same remote, mode and checkout state is updated
+    with a shallow fetch; anything else is replaced by a fresh clone.
+    Returns True if a clone was reused.
+    """
+    if os.path.isdir(os.path.join(repo_path, '.git')):
+        if _clone_matches(repo_path, repo_url, mode, no_checkout):
+            steps = [
+                (['fetch', '--depth=1', '--prune', '--no-tags', 'origin', 'HEAD'], 300),
+                # --soft moves HEAD without materializing files for no-checkout clones
+                (['reset', '--soft' if no_checkout else '--hard', 'FETCH_HEAD'], 120),
+            ]
+            if not no_checkout:
+                steps.append((['clean', '-fdx'], 60))
+            
+            for args, timeout in steps:
+                if _git('-C', repo_path, *args, timeout=timeout).returncode != 0:
+                    break
+            else:
+                return True
+    
+    # Remove existing clone if it exists
+    if os.path.exists(repo_path):
+        _remove_tree(repo_path)
+    
+    cmd = [
+        '-c', 'protocol.version=2', 'clone',
+        '--depth=1', '--single-branch', '--no-tags',
+        *CLONE_MODES[mode],
+    ]
+    # File-list-only callers don't need a working tree
+    if no_checkout:
+        cmd.append('--no-checkout')
+    cmd.extend([repo_url, repo_path])
+    
+    result = _git(*cmd, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"Git clone failed: {result.stderr}")
+    return False
+
+@contextlib.contextmanager
+def _repo_lock(repo_path):
+    """
+    Serialize clone/fetch work on one repo directory across threads and
+    gunicorn worker processes: a per-repo in-process lock, then an flock on
+    a lock file next to the clone.
+    """
+    with _REPO_LOCKS_LOCK:
+        lock = _REPO_LOCKS.setdefault(repo_path, threading.Lock())
+    with lock:
+        with open(f"{repo_path}.lock", 'w') as lock_file:
+            # Another worker may hold it for a whole clone; wait off the event loop
+            _run_blocking(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)
+            # Closing the file releases the flock
+            yield
+
 @app.route('/clone', methods=['POST'])
 def clone_repo():
-    """Clone a git repository"""
+    """Clone a git repository, or update an existing clone in place"""
     data = request.json
     repo_url = data.get('repo_url')
     owner = data.get('owner')
     repo = data.get('repo')
-    token = os.environ.get('GITHUB_TOKEN')
+    mode = data.get('mode', 'blobless')
+    no_checkout = bool(data.get('no_checkout', False))
     
     if not repo_url or not owner or not repo:
         return jsonify({"error": "Missing required parameters"}), 400
     
+    if mode not in CLONE_MODES:
+        return jsonify({"error": f"Invalid clone mode: {mode}"}), 400
+    
     repo_path = os.path.join(REPO_DIR, f"{owner}_{repo}")
     
     try:
-        # Remove existing clone if it exists
-        if os.path.exists(repo_path):
-            subprocess.run(['rm', '-rf', repo_path], check=True)
-        
-        # Clone the repository
-        clone_url = repo_url.replace('https://', f'https://{token}@') if token else repo_url
-        result = subprocess.run(
-            ['git', 'clone', '--depth', '1', clone_url, repo_path],
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        if result.returncode != 0:
-            return jsonify({"error": f"Git clone failed: {result.stderr}"}), 500
+        with _repo_lock(repo_path):
+            reused = _ensure_repo(repo_path, repo_url, mode, no_checkout)
         
         return jsonify({
             "status": "success",
             "path": repo_path,
-            "message": f"Repository cloned successfully"
+            "mode": mode,
+            "reused": reused,
+            "message": "Repository updated successfully" if reused else "Repository cloned successfully"
         })
     except subprocess.TimeoutExpired:
         return jsonify({"error": "Clone operation timed out"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _head_sha(repo_path):
+    """Current HEAD commit of a clone"""
+    result = _git('-C', repo_path, 'rev-parse', 'HEAD', timeout=10)
+    if result.returncode != 0:
+        raise RuntimeError(f"git rev-parse failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+def _is_partial_clone(repo_path):
+    """True for blobless/treeless clones, whose missing objects git fetches on demand"""
+    result = _git('-C', repo_path, 'config', '--get', 'remote.origin.promisor', timeout=10)
+    return result.stdout.strip() == 'true'
+
+def _tree_has_sizes(repo_path):
+    """
+    Whether `ls-tree -l` can report blob sizes from local objects.
+    A checked-out clone holds every HEAD blob; a --no-checkout partial clone
+    does not, and git would download each blob with its own lazy fetch.
+    """
+    if os.path.exists(os.path.join(repo_path, '.git', 'index')):
+        return True
+    return not _is_partial_clone(repo_path)
+
+def _list_tree_files(repo_path, with_sizes):
+    """
+    List files at HEAD from git's tree objects, without stat-ing the working tree.
+    with_sizes (see _tree_has_sizes) adds each blob's size. A treeless
+    --no-checkout clone still fetches each directory's tree lazily here.
+    """
+    result = _git('-C', repo_path, 'ls-tree', '-r', *(['-l'] if with_sizes else []), '-z', 'HEAD')
+    if result.returncode != 0:
+        raise RuntimeError(f"git ls-tree failed: {result.stderr.strip()}")
+    
+    files = []
+    # Each entry is "<mode> <type> <sha>[ <size>]\t<path>"
+    for entry in result.stdout.split('\0'):
+        if not entry:
+            continue
+        meta, rel_path = entry.split('\t', 1)
+        fields = meta.split()
+        # Skip submodule (commit) entries
+        if fields[1] != 'blob':
+            continue
+        file_entry = {
+            "path": rel_path,
+            "type": "file"
+        }
+        if with_sizes:
+            file_entry["size"] = int(fields[3])
+        files.append(file_entry)
+    return files
+
+def _walk_files(repo_path):
+    """List files by scanning the working tree (for checkouts without .git)"""
+    files = []
+    stack = [repo_path]
+    while stack:
+        # scandir yields DirEntry objects whose type/stat data comes from the directory read
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    # Skip .git directory
+                    if entry.name != '.git':
+                        stack.append(entry.path)
+                    continue
+                
+                # Like os.walk, symlinks to directories are neither followed nor listed
+                if entry.is_symlink() and entry.is_dir():
+                    continue
+                
+                files.append({
+                    "path": os.path.relpath(entry.path, repo_path),
+                    "type": "file",
+                    "size": entry.stat(follow_symlinks=False).st_size
+                })
+    return files
+
 @app.route('/files', methods=['GET'])
 def list_files():
     """List all files in the repository"""
@@ -73,30 +329,40 @@ def list_files():
     if not os.path.exists(repo_path):
         return jsonify({"error": "Repository not cloned"}), 404
     
-    files = []
     try:
-        for root, dirs, filenames in os.walk(repo_path):
-            # Skip .git directory
-            dirs[:] = [d for d in dirs if d != '.git']
-            
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(file_path, repo_path)
-                
-                # Skip .git files
-                if '.git' in rel_path:
-                    continue
-                
-                stat = os.stat(file_path)
-                files.append({
-                    "path": rel_path,
-                    "type": "file",
-                    "size": stat.st_size
-                })
+        if not os.path.isdir(os.path.join(repo_path, '.git')):
+            return jsonify({"files": _walk_files(repo_path)})
+        
+        # The listing only changes with HEAD or the clone's mode, so reuse the encoded body
+        head = _head_sha(repo_path)
+        with_sizes = _tree_has_sizes(repo_path)
+        key = (owner, repo)
+        with _FILES_CACHE_LOCK:
+            cached = _FILES_CACHE.get(key)
+            if cached and cached[:2] == (head, with_sizes):
+                _FILES_CACHE.move_to_end(key)
+                return Response(cached[2], mimetype='application/json')
+        
+        body = orjson.dumps({"files": _list_tree_files(repo_path, with_sizes)})
+        with _FILES_CACHE_LOCK:
+            _FILES_CACHE[key] = (head, with_sizes, body)
+            _FILES_CACHE.move_to_end(key)
+            while len(_FILES_CACHE) > FILES_CACHE_SIZE:
+                _FILES_CACHE.popitem(last=False)
+        return Response(body, mimetype='application/json')
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
-    return jsonify({"files": files})
+
+def _resolve_in_repo(repo_real, file_path):
+    """
+    Resolve file_path (following symlinks) under the already-resolved repo root.
+    Returns None if the result escapes the repo, including via a sibling
+    directory that merely shares the prefix (/repos/foo vs /repos/foobar).
+    """
+    full_real = os.path.realpath(os.path.join(repo_real, file_path))
+    if os.path.commonpath([full_real, repo_real]) != repo_real:
+        return None
+    return full_real
 
 @app.route('/file/<path:file_path>', methods=['GET'])
 def get_file(file_path):
@@ -108,10 +374,10 @@ def get_file(file_path):
         return jsonify({"error": "Missing owner or repo parameter"}), 400
     
     repo_path = os.path.join(REPO_DIR, f"{owner}_{repo}")
-    full_path = os.path.join(repo_path, file_path)
     
     # Security check: ensure path is within repo directory
-    if not os.path.abspath(full_path).startswith(os.path.abspath(repo_path)):
+    full_path = _resolve_in_repo(os.path.realpath(repo_path), file_path)
+    if full_path is None:
         return jsonify({"error": "Invalid file path"}), 400
     
     if not os.path.exists(full_path):
@@ -121,74 +387,270 @@ def get_file(file_path):
         return jsonify({"error": "Path is not a file"}), 400
     
     try:
-        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        # ?raw=1 serves the bytes as-is (sendfile, ETag/Range support)
+        if request.args.get('raw'):
+            return send_file(
+                full_path,
+                mimetype='text/plain',
+                conditional=True,
+                etag=True,
+                last_modified=os.path.getmtime(full_path)
+            )
         
-        return jsonify({
-            "path": file_path,
-            "content": content
-        })
+        # Unbuffered binary file: each read() is a single read(2), no TextIOWrapper
+        f = open(full_path, 'rb', buffering=0)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        # Emit {"path": ..., "content": ...} with the content escaped chunk by chunk
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        with f:
+            yield b'{"path":' + orjson.dumps(file_path) + b',"content":"'
+            while True:
+                chunk = f.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield orjson.dumps(text)[1:-1]
+            yield b'"}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
-@app.route('/analyze', methods=['POST'])
-def analyze_files():
-    """Get multiple files for analysis"""
-    data = request.json
-    owner = data.get('owner')
-    repo = data.get('repo')
-    file_paths = data.get('file_paths', [])
-    max_size = data.get('max_size', 8000)  # Max file size in bytes
+def _kernel_supports_uring():
+    """IORING_OP_OPENAT needs Linux 5.6+"""
+    try:
+        major, minor = (int(part) for part in os.uname().release.split('.')[:2])
+    except ValueError:
+        return False
+    return (major, minor) >= (5, 6)
+
+class _UringReader:
+    """Batches file opens/reads/closes through one shared io_uring instance"""
     
-    if not owner or not repo:
-        return jsonify({"error": "Missing owner or repo parameter"}), 400
+    def __init__(self, depth=URING_QUEUE_DEPTH):
+        self.depth = depth
+        self.ring = liburing.io_uring()
+        self.cqe = liburing.io_uring_cqe()
+        liburing.io_uring_queue_init(depth, self.ring, 0)
+        # The ring is not thread-safe; requests take turns submitting batches
+        self.lock = _os_lock()
     
-    repo_path = os.path.join(REPO_DIR, f"{owner}_{repo}")
+    def _submit(self, preps):
+        """Queue one SQE per prep callback, submit them together and collect cqe.res in order"""
+        results = [None] * len(preps)
+        for index, prep in enumerate(preps):
+            sqe = liburing.io_uring_get_sqe(self.ring)
+            prep(sqe)
+            liburing.io_uring_sqe_set_data64(sqe, index)
+        liburing.io_uring_submit(self.ring)
+        for _ in preps:
+            liburing.io_uring_wait_cqe(self.ring, self.cqe)
+            results[liburing.io_uring_cqe_get_data64(self.cqe)] = self.cqe.res
+            liburing.io_uring_cqe_seen(self.ring, self.cqe)
+        return results
     
-    if not os.path.exists(repo_path):
-        return jsonify({"error": "Repository not cloned"}), 404
+    def read_files(self, paths, max_size):
+        """Read up to max_size bytes of each path; failed entries are negative errnos"""
+        results = []
+        with self.lock:
+            for start in range(0, len(paths), self.depth):
+                # The kernel reads these paths at submit time, so the encoded
+                # bytes must stay referenced until every open has completed
+                batch = [os.fsencode(path) for path in paths[start:start + self.depth]]
+                fds = self._submit([
+                    lambda sqe, path=path: liburing.io_uring_prep_openat(
+                        sqe, path, os.O_RDONLY | os.O_CLOEXEC, 0, liburing.AT_FDCWD
+                    )
+                    for path in batch
+                ])
+                opened = [(i, fd, bytearray(max_size)) for i, fd in enumerate(fds) if fd >= 0]
+                sizes = self._submit([
+                    lambda sqe, fd=fd, buf=buf: liburing.io_uring_prep_read(sqe, fd, buf, max_size, 0)
+                    for _, fd, buf in opened
+                ])
+                self._submit([
+                    lambda sqe, fd=fd: liburing.io_uring_prep_close(sqe, fd)
+                    for _, fd, _ in opened
+                ])
+                batch_results = list(fds)
+                for (i, _, buf), size in zip(opened, sizes):
+                    batch_results[i] = bytes(buf[:size]) if size >= 0 else size
+                results.extend(batch_results)
+        return results
+
+_uring_reader = None
+_uring_init_lock = _os_lock()
+
+def _get_uring_reader():
+    """Lazily create the shared io_uring reader; None when io_uring is unavailable"""
+    global _uring_reader, liburing
+    if liburing is None or not _kernel_supports_uring():
+        return None
+    with _uring_init_lock:
+        if _uring_reader is None:
+            try:
+                _uring_reader = _UringReader()
+            except Exception as e:
+                app.logger.warning(f"io_uring unavailable, using blocking reads: {e}")
+                liburing = None
+                return None
+    return _uring_reader
+
+def _analyze_files_uring(paths, max_size):
+    """Batch-read paths via io_uring; returns bytes/negative errno per path, or None to fall back"""
+    reader = _get_uring_reader()
+    if reader is None:
+        return None
+    try:
+        return reader.read_files(paths, max_size)
+    except Exception as e:
+        app.logger.warning(f"io_uring batch read failed, using blocking reads: {e}")
+        return None
+
+def _fast_read(path, size):
+    """
+    Read up to size bytes with one read(2), skipping Python's buffered/text IO layers.
+    Returns (data, file size).
+    """
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        file_size = os.fstat(fd).st_size
+        # os.read allocates its full length up front; don't ask for more than the file holds
+        return os.read(fd, min(size, file_size)), file_size
+    finally:
+        os.close(fd)
+
+def _content_entry(file_path, data, file_size):
+    """Result entry for bytes read from a file; binary files are reported without decoding"""
+    if b'\0' in data[:BINARY_SNIFF_SIZE]:
+        return {
+            "path": file_path,
+            "content": "",
+            "binary": True,
+            "size": file_size
+        }
+    
+    return {
+        "path": file_path,
+        "content": data.decode('utf-8', 'ignore')
+    }
+
+def _read_one(file_path, full_path, max_size):
+    """Read one validated /analyze file and return its result entry"""
+    try:
+        return _content_entry(file_path, *_fast_read(full_path, max_size))
+    except Exception as e:
+        return {
+            "path": file_path,
+            "content": "",
+            "error": str(e)
+        }
+
+def _read_all(pending, max_size):
+    """Yield _read_one results for pending (file_path, full_path, size) entries in order, overlapping the reads"""
+    read = lambda item: _read_one(item[0], item[1], max_size)
+    if GEVENT_PATCHED:
+        yield from gevent.get_hub().threadpool.imap(read, pending)
+        return
     
-    results = []
+    # Blocking reads release the GIL, so a pool overlaps the I/O across files
+    with ThreadPoolExecutor(max_workers=max(1, min(ANALYZE_READ_WORKERS, len(pending)))) as executor:
+        yield from executor.map(read, pending)
+
+def _analysis_entries(repo_path, file_paths, max_size):
+    """Yield the /analyze result entry for each requested path, in request order"""
+    # Resolved once per request rather than per file
+    repo_real = os.path.realpath(repo_path)
+    
+    # Rejected paths get their entry up front; None marks a file still to be read
+    entries = []
+    pending = []
     for file_path in file_paths:
-        full_path = os.path.join(repo_path, file_path)
-        
         # Security check
-        if not os.path.abspath(full_path).startswith(os.path.abspath(repo_path)):
-            results.append({
+        full_path = _resolve_in_repo(repo_real, file_path)
+        if full_path is None:
+            entries.append({
                 "path": file_path,
                 "content": "",
                 "error": "Invalid file path"
             })
             continue
         
-        if not os.path.exists(full_path) or not os.path.isfile(full_path):
-            results.append({
+        # One stat both validates the path and records the size binary entries report
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            entries.append({
                 "path": file_path,
                 "content": "",
                 "error": "File not found"
             })
             continue
         
-        try:
-            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read(max_size)
-            
-            results.append({
-                "path": file_path,
-                "content": content
-            })
-        except Exception as e:
-            results.append({
+        entries.append(None)
+        pending.append((file_path, full_path, st.st_size))
+    
+    paths = [full_path for _, full_path, _ in pending]
+    batch = _run_blocking(_analyze_files_uring, paths, max_size) if pending else None
+    
+    if batch is not None:
+        reads = iter([
+            {
                 "path": file_path,
                 "content": "",
-                "error": str(e)
-            })
+                "error": str(OSError(-raw, os.strerror(-raw)))
+            } if isinstance(raw, int) else _content_entry(file_path, raw, file_size)
+            for (file_path, _, file_size), raw in zip(pending, batch)
+        ])
+    else:
+        reads = _read_all(pending, max_size)
+    
+    for entry in entries:
+        yield entry if entry is not None else next(reads)
+
+@app.route('/analyze', methods=['POST'])
+def analyze_files():
+    """
+    Get multiple files for analysis.
+    Streams one JSON object per line (NDJSON) as files are read;
+    ?stream=0 returns the legacy {"files": [...]} document instead.
+    """
+    data = request.json
+    owner = data.get('owner')
+    repo = data.get('repo')
+    file_paths = data.get('file_paths', [])
+    max_size = data.get('max_size', 8000)  # Max file size in bytes
+    
+    if not owner or not repo:
+        return jsonify({"error": "Missing owner or repo parameter"}), 400
+    
+    if type(max_size) is not int or not 1 <= max_size <= MAX_ANALYZE_SIZE:
+        return jsonify({"error": f"max_size must be an integer between 1 and {MAX_ANALYZE_SIZE}"}), 400
     
-    return jsonify({"files": results})
+    repo_path = os.path.join(REPO_DIR, f"{owner}_{repo}")
+    
+    if not os.path.exists(repo_path):
+        return jsonify({"error": "Repository not cloned"}), 404
+    
+    entries = _analysis_entries(repo_path, file_paths, max_size)
+    
+    if request.args.get('stream') == '0':
+        return jsonify({"files": list(entries)})
+    
+    return Response(
+        stream_with_context(orjson.dumps(entry) + b'\n' for entry in entries),
+        mimetype='application/x-ndjson'
+    )
+
+# Create repos directory if it doesn't exist (also when imported by gunicorn)
+os.makedirs(REPO_DIR, exist_ok=True)
 
 if __name__ == '__main__':
-    # Create repos directory if it doesn't exist
-    os.makedirs(REPO_DIR, exist_ok=True)
+    # Local development only; the container runs gunicorn (see gunicorn_conf.py)
     app.run(host='0.0.0.0', port=8080)
 
 
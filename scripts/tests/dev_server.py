@@ -1,5 +1,6 @@
 import os
 import subprocess
+import socket
 import time
 import requests
 import signal
@@ -18,16 +19,26 @@ class DevServer:
             
         self.process = None
         self.url = f"http://localhost:{self.port}"
+        # Reused across readiness checks so polling doesn't reconnect each time
+        self.session = requests.Session()
 
     def is_running(self):
         """Check if the server is responding at the expected URL."""
         try:
             # Try hitting the health endpoint or root
-            response = requests.get(f"{self.url}/api/health/latest", timeout=1)
+            response = self.session.get(f"{self.url}/api/health/latest", timeout=1)
             return True
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             return False
 
+    def is_listening(self, timeout):
+        """Cheap TCP-level check that something accepts connections on the port."""
+        try:
+            with socket.create_connection(("localhost", self.port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
     def start(self):
         """Start the local worker dev server in a subprocess."""
         if self.is_running():
@@ -40,7 +51,7 @@ class DevServer:
         print(f"🚀 Starting local worker on port {self.port}...")
         
         # Command to run wrangler dev
-        cmd = ["npx", "wrangler", "dev", "--port", str(self.port)]
+        cmd = shared_config.wrangler_command() + ["dev", "--port", str(self.port)]
         
         # Start process
         # process_group=True (setsid) ensures we can kill the whole tree if needed
@@ -52,11 +63,13 @@ class DevServer:
             universal_newlines=True
         )
 
-        # Wait for server to become ready
+        # Wait for server to become ready: probe the TCP port with exponential
+        # backoff and only confirm over HTTP once it accepts connections
         print("⏳ Waiting for server to be ready...")
-        max_retries = 30
-        for i in range(max_retries):
-            if self.is_running():
+        delay = 0.025
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.is_listening(delay) and self.is_running():
                 print(f"✅ Server ready at {self.url}")
                 # Register cleanup only if we started it
                 atexit.register(self.stop)
@@ -70,8 +83,8 @@ class DevServer:
                 print(f"Stderr: {stderr}")
                 raise RuntimeError("Server process terminated unexpectedly")
                 
-            time.sleep(1)
-            print(f"   ...waiting ({i+1}/{max_retries})")
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.5)
 
         self.stop()
         raise TimeoutError("Server failed to start within expected time")
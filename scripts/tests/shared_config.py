@@ -1,6 +1,32 @@
 import os
+import io
+import sys
+import asyncio
 import json
 import re
+import errno
+import socket
+import functools
+import importlib.util
+import contextlib
+import contextvars
+
+import shutil
+import subprocess
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import pyjson5
+except ImportError:
+    pyjson5 = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 # Resolve Project Roots
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -8,6 +34,26 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 WRANGLER_PATH = os.path.join(PROJECT_ROOT, "wrangler.jsonc")
 
+# Matches a JSON string (group 1, kept as-is) or a // / /* */ comment (dropped)
+_JSONC_COMMENT_RE = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+# HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+def make_session():
+    """
+    Returns a requests.Session with pooled keep-alive connections.
+    Idempotent requests are retried on gateway errors; refused connections are
+    not retried so readiness probes still fail fast.
+    """
+    retry = Retry(total=3, connect=0, backoff_factor=0.3,
+                  status_forcelist=[502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 def print_info(msg):
     print(f"ℹ️  {msg}")
 
@@ -17,6 +63,106 @@ def print_success(msg):
 def print_fail(msg):
     print(f"❌ {msg}")
 
+# KEY=value line; comment and blank lines don't match
+_ENV_LINE = re.compile(r'\s*([^#=\s][^=]*)=(.*)')
+
+# Value wrapped in a matching pair of single or double quotes
+_UNQUOTE = re.compile(r'(["\'])(.*)\1', re.DOTALL)
+
+def _unquote(value):
+    """Removes one pair of matching surrounding quotes, leaving inner/unbalanced quotes alone"""
+    m = _UNQUOTE.fullmatch(value)
+    return m.group(2) if m else value
+
+def iter_env_lines(lines):
+    """Yields (key, value) with surrounding whitespace stripped for each KEY=value line"""
+    for line in lines:
+        m = _ENV_LINE.match(line)
+        if m:
+            yield m.group(1).strip(), m.group(2).strip()
+
+# Socket state code for LISTEN in /proc/net/tcp{,6}
+_TCP_LISTEN = "0A"
+
+# Buffer that print() output of the current thread/asyncio task is routed to (None = real stdout)
+_OUTPUT_BUFFER = contextvars.ContextVar("output_buffer", default=None)
+
+class _ContextStdout:
+    """sys.stdout proxy that writes to the active captured_output() buffer, if any."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        buffer = _OUTPUT_BUFFER.get()
+        return (buffer if buffer is not None else self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+@contextlib.contextmanager
+def captured_output():
+    """
+    Buffers everything printed by the current thread or asyncio task.
+    Lets concurrently running tests print their output as one block afterwards.
+    Threads started via asyncio.to_thread inherit the buffer.
+    """
+    if not isinstance(sys.stdout, _ContextStdout):
+        sys.stdout = _ContextStdout(sys.stdout)
+    buffer = io.StringIO()
+    token = _OUTPUT_BUFFER.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _OUTPUT_BUFFER.reset(token)
+
+async def run_captured(coro):
+    """Awaits coro with its output buffered; returns (result, output)"""
+    with captured_output() as buffer:
+        result = await coro
+    return result, buffer.getvalue()
+
+async def gather_in_order(coros):
+    """
+    Runs coroutines concurrently, each with its output buffered, and prints the
+    outputs as blocks in the given order once all of them have finished.
+    Returns the results in the same order (None for a coroutine that raised).
+    Blocking work can be passed in as asyncio.to_thread(...).
+    """
+    outcomes = await asyncio.gather(*(run_captured(coro) for coro in coros), return_exceptions=True)
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            print_fail(f"Test crashed: {outcome}")
+            results.append(None)
+        else:
+            result, output = outcome
+            print(output, end="")
+            results.append(result)
+    return results
+
+def _strip_jsonc_comments(text):
+    """Removes JSONC comments while leaving string literals (e.g. URLs) intact"""
+    return _JSONC_COMMENT_RE.sub(lambda m: m.group(1) or '', text)
+
+def _parse_jsonc(text):
+    """Parses JSONC text natively with pyjson5 when installed, else strips comments for json"""
+    if pyjson5 is not None:
+        return pyjson5.decode(text)
+    return json.loads(_strip_jsonc_comments(text))
+
+@functools.lru_cache(maxsize=4)
+def _load_wrangler(path, mtime):
+    """
+    Returns the parsed wrangler config, read and parsed once per file version.
+    mtime is part of the cache key so edits to the file are picked up.
+    """
+    with open(path, 'r') as f:
+        return _parse_jsonc(f.read())
+
 def get_wrangler_port(default_port=8787):
     """
     Parses wrangler.jsonc to find dev.port using robust regex.
@@ -29,25 +175,20 @@ def get_wrangler_port(default_port=8787):
             print_fail(f"wrangler.jsonc not found at {WRANGLER_PATH}")
             return default_port
 
-        with open(WRANGLER_PATH, 'r') as f:
-            text = f.read()
-        
-        # Regex to remove comments (// ... and /* ... */)
-        pattern = re.compile(r'//.*?$|/\*.*?\*/', re.MULTILINE | re.DOTALL)
-        clean_text = re.sub(pattern, '', text)
-        
         # 1. Try JSON Parsing
         try:
-            wrangler_config = json.loads(clean_text)
+            wrangler_config = _load_wrangler(WRANGLER_PATH, os.path.getmtime(WRANGLER_PATH))
             if "dev" in wrangler_config and "port" in wrangler_config["dev"]:
                  port = wrangler_config["dev"]["port"]
                  print_success(f"Found Cloudflare Worker PORT (JSON): {port}")
                  return int(port)
-        except json.JSONDecodeError:
+        except ValueError:
             pass # Fallthrough
         
         # 2. Fallback: Regex Search
-        match = re.search(r'"port"\s*:\s*(\d+)', clean_text)
+        with open(WRANGLER_PATH, 'r') as f:
+            text = f.read()
+        match = re.search(r'"port"\s*:\s*(\d+)', _strip_jsonc_comments(text))
         if match:
             port = int(match.group(1))
             print_success(f"Found Cloudflare Worker PORT (Regex): {port}")
@@ -59,20 +200,105 @@ def get_wrangler_port(default_port=8787):
     print_info(f"Using default port {default_port}")
     return default_port
 
+@functools.lru_cache(maxsize=1)
+def wrangler_command():
+    """
+    Returns the argv prefix that runs wrangler, resolved once per run.
+    Prefers the project's own install, then wrangler on PATH, and only goes
+    through a package runner (bunx/npx) when neither exists.
+    """
+    local = shutil.which("wrangler", path=os.path.join(PROJECT_ROOT, "node_modules", ".bin"))
+    if local:
+        return [local]
+    on_path = shutil.which("wrangler")
+    if on_path:
+        return [on_path]
+    for runner in ("bunx", "npx"):
+        resolved = shutil.which(runner)
+        if resolved:
+            return [resolved, "wrangler"]
+    return ["npx", "wrangler"]
+
+def port_in_use(port):
+    """
+    Cheap check for anything bound to port on 127.0.0.1 or ::1: tries to bind
+    it. Lets callers skip the PID lookup when the port is already free.
+    """
+    for family, host in ((socket.AF_INET, "127.0.0.1"), (socket.AF_INET6, "::1")):
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as s:
+                s.bind((host, port))
+        except OSError as e:
+            if e.errno == errno.EADDRINUSE:
+                return True
+            # Other errors (e.g. no IPv6 on this host) say nothing about the port
+    return False
+
+def _listening_socket_inodes(port):
+    """Inodes of sockets listening on port, read from /proc/net/tcp and tcp6"""
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table, 'r') as f:
+                next(f)  # header
+                for line in f:
+                    # sl local_address rem_address st ... inode
+                    fields = line.split()
+                    local_port = int(fields[1].rsplit(":", 1)[1], 16)
+                    if local_port == port and fields[3] == _TCP_LISTEN:
+                        inodes.add(fields[9])
+        except FileNotFoundError:
+            continue
+    return inodes
+
+def pids_on_port(port):
+    """
+    Returns the PIDs listening on a TCP port.
+    Reads /proc directly on Linux, uses psutil elsewhere (e.g. macOS) and
+    only shells out to lsof when neither is available.
+    """
+    if os.path.exists("/proc/net/tcp"):
+        targets = {f"socket:[{inode}]" for inode in _listening_socket_inodes(port)}
+        if not targets:
+            return []
+        pids = []
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            fd_dir = f"/proc/{pid}/fd"
+            try:
+                if any(os.readlink(os.path.join(fd_dir, fd)) in targets for fd in os.listdir(fd_dir)):
+                    pids.append(int(pid))
+            except OSError:
+                continue  # Process exited or belongs to another user
+        return pids
+
+    if psutil is not None:
+        try:
+            return sorted({
+                conn.pid for conn in psutil.net_connections(kind="inet")
+                if conn.pid and conn.laddr and conn.laddr.port == port and conn.status == psutil.CONN_LISTEN
+            })
+        except psutil.AccessDenied:
+            pass  # macOS needs root for system-wide connections
+
+    # -n/-P skip DNS and service-name lookups, -S bounds lsof's kernel calls
+    cmd = ["lsof", "-nP", "-S", "2", "-t", f"-iTCP:{port}", "-sTCP:LISTEN"]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+    except subprocess.TimeoutExpired:
+        print_fail(f"lsof timed out looking up port {port}")
+        return []
+    return [int(pid) for pid in result.stdout.split()]
+
 def kill_process_on_port(port):
     """Kills any process listening on the specified port"""
-    import subprocess
     import signal
     
     try:
-        # lsof to find PID
-        cmd = ["lsof", "-t", "-i", f":{port}"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0 and result.stdout.strip():
-            pids = result.stdout.strip().split('\n')
+        if not port_in_use(port):
+            return False
+        pids = pids_on_port(port)
+        if pids:
             for pid in pids:
-                pid = int(pid)
                 print_info(f"Killing process {pid} on port {port}")
                 try:
                     os.kill(pid, signal.SIGKILL)
@@ -95,48 +321,55 @@ def get_wrangler_vars():
         return config_vars
 
     try:
-        with open(WRANGLER_PATH, 'r') as f:
-            text = f.read()
-        
-        # Step 1: Remove block comments /* ... */
-        text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
-        
-        # Step 2: Remove line comments // ... but preserve strings
-        # This regex preserves content inside quotes
-        lines = []
-        for line in text.split('\n'):
-            # Find // outside of quotes
-            in_string = False
-            quote_char = None
-            comment_start = -1
-            
-            for i, char in enumerate(line):
-                if char in ('"', "'") and (i == 0 or line[i-1] != '\\'):
-                    if not in_string:
-                        in_string = True
-                        quote_char = char
-                    elif char == quote_char:
-                        in_string = False
-                        quote_char = None
-                elif char == '/' and i + 1 < len(line) and line[i + 1] == '/' and not in_string:
-                    comment_start = i
-                    break
-            
-            if comment_start >= 0:
-                lines.append(line[:comment_start])
-            else:
-                lines.append(line)
+        data = _load_wrangler(WRANGLER_PATH, os.path.getmtime(WRANGLER_PATH))
+        # Copy so callers can't mutate the cached config
+        config_vars = dict(data.get("vars", {}))
         
-        clean_text = '\n'.join(lines)
-        
-        # Step 3: Parse JSON
-        data = json.loads(clean_text)
-        config_vars = data.get("vars", {})
-        
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print_fail(f"Error parsing wrangler.jsonc: {e}")
     except Exception as e:
         print_fail(f"Unexpected error reading wrangler.jsonc: {e}")
         
     return config_vars
 
+@functools.lru_cache(maxsize=1)
+def _read_dev_vars():
+    """Parses .dev.vars (KEY=value lines) from the current directory once per run"""
+    env_vars = {}
+    try:
+        with open(".dev.vars", "r") as f:
+            for key, value in iter_env_lines(f):
+                env_vars[key] = _unquote(value)
+    except FileNotFoundError:
+        pass
+    return env_vars
+
+@functools.lru_cache(maxsize=1)
+def _read_wrangler_toml_vars():
+    """Parses the [vars] section of wrangler.toml from the current directory once per run"""
+    wrangler_vars = {}
+    try:
+        with open("wrangler.toml", "r") as f:
+            in_vars = False
+            for line in f:
+                line = line.strip()
+                if line == "[vars]":
+                    in_vars = True
+                    continue
+                elif line.startswith("[") and in_vars:
+                    break
+
+                if in_vars:
+                    for key, value in iter_env_lines((line,)):
+                        wrangler_vars[key] = _unquote(value)
+    except FileNotFoundError:
+        pass
+    return wrangler_vars
+
+def load_env_vars():
+    """Load env vars from .dev.vars (cached; returns a copy)"""
+    return dict(_read_dev_vars())
+
+def load_wrangler_vars():
+    """Load vars section from wrangler.toml (cached; returns a copy)"""
+    return dict(_read_wrangler_toml_vars())
@@ -1,9 +1,9 @@
 import os
 import sys
 import json
-import urllib.request
-import urllib.error
+import asyncio
 import subprocess
+import httpx
 
 # Add current directory to path to import shared_config
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -49,25 +49,20 @@ def load_dev_vars():
 
 # --- HTTP / CURL Runners (Existing) ---
 
-def run_python_test(url, headers, payload, response_parser):
-    """Generic Python urllib tester"""
+async def run_python_test(client, url, headers, payload, response_parser):
+    """Generic Python httpx tester"""
     shared_config.print_info(f"Sending Python Request...")
     try:
-        req = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'), headers=headers)
-        with urllib.request.urlopen(req) as response:
-            status_code = response.getcode()
-            response_body = response.read().decode('utf-8')
-            if status_code == 200:
-                shared_config.print_success("Python Request: SUCCESS")
-                try:
-                    response_parser(json.loads(response_body))
-                except:
-                    print(response_body)
-            else:
-                shared_config.print_fail(f"Request Failed: {status_code}")
-    except urllib.error.HTTPError as e:
-        shared_config.print_fail(f"HTTP Error {e.code}: {e.reason}")
-        print(f"Details: {e.read().decode('utf-8')}")
+        response = await client.post(url, json=payload, headers=headers)
+        if response.status_code == 200:
+            shared_config.print_success("Python Request: SUCCESS")
+            try:
+                response_parser(response.json())
+            except:
+                print(response.text)
+        else:
+            shared_config.print_fail(f"HTTP Error {response.status_code}: {response.reason_phrase}")
+            print(f"Details: {response.text}")
     except Exception as e:
         shared_config.print_fail(f"Python Error: {e}")
 
@@ -187,6 +182,24 @@ def parse_openai(json_resp):
     else:
         print(json.dumps(json_resp, indent=2))
 
+# --- Concurrent Runner ---
+
+async def run_job(provider, method, model, coro):
+    """Runs one test under its header"""
+    print_header(provider, method, model)
+    await coro
+
+async def run_jobs(jobs):
+    """
+    Runs (provider, method, model, make_coro) jobs concurrently over one shared client.
+    Output is printed in job order once all of them have finished.
+    Blocking tests (curl, SDKs) run in worker threads via asyncio.to_thread.
+    """
+    async with httpx.AsyncClient(http2=shared_config.HTTP2_ENABLED, timeout=30) as client:
+        await shared_config.gather_in_order(
+            run_job(provider, method, model, make_coro(client)) for provider, method, model, make_coro in jobs
+        )
+
 def main():
     # 1. Load Config
     dev_vars = load_dev_vars()
@@ -208,12 +221,12 @@ def main():
     
     ua_spoof = "Mozilla/5.0"
     base_gateway_url = GATEWAY_BASE_PATTERN.format(account_id=account_id, gateway_name=gateway_name)
+    jobs = []
 
     # ==========================================
     # TEST SUITE 1: GEMINI
     # ==========================================
     if gemini_key:
-        print_header("GEMINI", "Setup", gemini_model)
         gemini_url = f"{base_gateway_url}/google-ai-studio/v1beta/models/{gemini_model}:generateContent"
         
         gemini_headers = {
@@ -227,14 +240,14 @@ def main():
             "contents": [{"role": "user", "parts": [{"text": "What is Cloudflare? One sentence."}]}]
         }
 
-        print_header("GEMINI", "Python (urllib)", gemini_model)
-        run_python_test(gemini_url, gemini_headers, gemini_payload, parse_gemini)
-
-        print_header("GEMINI", "Curl (subprocess)", gemini_model)
-        run_curl_test(gemini_url, gemini_headers, gemini_payload, parse_gemini)
-
-        print_header("GEMINI", "Python SDK (google.genai)", gemini_model)
-        run_gemini_sdk_test(gemini_key, base_gateway_url, aig_token, gemini_model)
+        jobs += [
+            ("GEMINI", "Python (httpx)", gemini_model,
+             lambda client: run_python_test(client, gemini_url, gemini_headers, gemini_payload, parse_gemini)),
+            ("GEMINI", "Curl (subprocess)", gemini_model,
+             lambda client: asyncio.to_thread(run_curl_test, gemini_url, gemini_headers, gemini_payload, parse_gemini)),
+            ("GEMINI", "Python SDK (google.genai)", gemini_model,
+             lambda client: asyncio.to_thread(run_gemini_sdk_test, gemini_key, base_gateway_url, aig_token, gemini_model)),
+        ]
 
     else:
         shared_config.print_fail("Skipping Gemini tests (GEMINI_API_KEY missing)")
@@ -244,7 +257,6 @@ def main():
     # TEST SUITE 2: OPENAI
     # ==========================================
     if openai_key:
-        print_header("OPENAI", "Setup", openai_model)
         openai_url = f"{base_gateway_url}/openai/chat/completions"
         
         openai_headers = {
@@ -259,17 +271,23 @@ def main():
             "messages": [{"role": "user", "content": "What is Cloudflare? One sentence."}]
         }
 
-        print_header("OPENAI", "Python (urllib)", openai_model)
-        run_python_test(openai_url, openai_headers, openai_payload, parse_openai)
-
-        print_header("OPENAI", "Curl (subprocess)", openai_model)
-        run_curl_test(openai_url, openai_headers, openai_payload, parse_openai)
-
-        print_header("OPENAI", "Python SDK (openai)", openai_model)
-        run_openai_sdk_test(openai_key, base_gateway_url, aig_token, openai_model)
+        jobs += [
+            ("OPENAI", "Python (httpx)", openai_model,
+             lambda client: run_python_test(client, openai_url, openai_headers, openai_payload, parse_openai)),
+            ("OPENAI", "Curl (subprocess)", openai_model,
+             lambda client: asyncio.to_thread(run_curl_test, openai_url, openai_headers, openai_payload, parse_openai)),
+            ("OPENAI", "Python SDK (openai)", openai_model,
+             lambda client: asyncio.to_thread(run_openai_sdk_test, openai_key, base_gateway_url, aig_token, openai_model)),
+        ]
 
     else:
         shared_config.print_fail("Skipping OpenAI tests (OPENAI_API_KEY missing)")
 
+    # ==========================================
+    # RUN: both suites fan out concurrently
+    # ==========================================
+    if jobs:
+        asyncio.run(run_jobs(jobs))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
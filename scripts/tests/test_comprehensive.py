@@ -1,11 +1,14 @@
 import requests
 import json
 import time
+import random
 import sys
 import os
 import argparse
 import subprocess
+import signal
 import socket
+import selectors
 import re
 
 # Get absolute path to ask-cloudflare-mcp root
@@ -34,36 +37,94 @@ def kill_port(port):
     """Kills any process listening on the specified port."""
     print_info(f"Checking for processes on port {port}...")
     try:
-        # Find PID using lsof
-        cmd = ["lsof", "-t", "-i", f":{port}"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        pids = result.stdout.strip().split('\n')
+        pids = shared_config.pids_on_port(port) if shared_config.port_in_use(port) else []
         
-        if any(pids) and pids[0]:
+        if pids:
             for pid in pids:
-                if pid:
-                    print_info(f"Killing process {pid} on port {port}...")
-                    subprocess.run(["kill", "-9", pid], check=True)
+                print_info(f"Killing process {pid} on port {port}...")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass  # Already exited
             print_success(f"Port {port} cleared.")
         else:
             print_info(f"Port {port} is already free.")
     except Exception as e:
         print_fail(f"Error clearing port {port}: {e}")
 
-def wait_for_server(url, timeout=30):
-    """Waits for the server to become responsive."""
+def stop_process_group(process, timeout=3):
+    """
+    Sends SIGTERM to the process group led by process, escalating to SIGKILL
+    after timeout seconds. Returns True if it exited on SIGTERM.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=timeout)
+        return True
+    except ProcessLookupError:
+        process.wait()
+        return True
+    except subprocess.TimeoutExpired:
+        print_info("Dev server did not exit, killing it...")
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+        return False
+
+# Wrangler stderr output that means startup has failed
+STARTUP_ERROR_MARKERS = (b"EADDRINUSE", b"[ERROR]", b"Error:")
+
+def wait_for_server(url, timeout=30, process=None):
+    """
+    Waits for the server to become responsive.
+    If the server's process is given, its stderr is watched so a crash or
+    startup error fails right away instead of after the full timeout.
+    """
     print_info(f"Waiting for server at {url}...")
     start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            requests.get(url, timeout=1)
-            print_success("Server is up!")
-            return True
-        except requests.exceptions.RequestException:
-            time.sleep(1)
+    sel = None
+    stderr = bytearray()
+    if process is not None and process.stderr is not None:
+        sel = selectors.DefaultSelector()
+        sel.register(process.stderr, selectors.EVENT_READ)
+    try:
+        # Start polling at 50ms and double up to 1s so fast startups are caught quickly
+        delay = 0.05
+        while time.time() - start_time < timeout:
+            try:
+                SESSION.get(url, timeout=0.5)
+                print_success("Server is up!")
+                return True
+            except requests.exceptions.RequestException:
+                pass
+            
+            if sel is None:
+                time.sleep(delay)
+            else:
+                # Doubles as the backoff sleep but wakes up as soon as stderr has output
+                for key, _ in sel.select(delay):
+                    chunk = os.read(key.fd, 4096)
+                    if chunk:
+                        stderr += chunk
+                    else:
+                        sel.unregister(key.fileobj)  # EOF
+                if process.poll() is not None or any(marker in stderr for marker in STARTUP_ERROR_MARKERS):
+                    print("")
+                    print_fail("Server failed to start.")
+                    break
+            delay = min(delay * 2, 1.0)
             print(".", end="", flush=True)
-    print("")
-    print_fail("Server timeout.")
+        else:
+            print("")
+            print_fail("Server timeout.")
+    finally:
+        if sel is not None:
+            sel.close()
+    
+    if stderr:
+        print_fail(f"STDERR:\n{stderr.decode('utf-8', 'replace')}")
     return False
 
 def check_response(response, expected_status=200):
@@ -84,11 +145,7 @@ def load_env_file(filepath):
     if os.path.exists(filepath):
         print_info(f"Loading config from {filepath}")
         with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    config[key.strip()] = value.strip()
+            config.update(shared_config.iter_env_lines(f))
     return config
 
 # --- LOAD CONFIGURATION NOW ---
@@ -97,6 +154,9 @@ LOCAL_PORT = shared_config.get_wrangler_port()
 LOCAL_URL = f"http://localhost:{LOCAL_PORT}"
 PROJECT_ROOT = shared_config.PROJECT_ROOT # Ensure consistency
 
+# Keep-alive connections shared by every request in the run
+SESSION = shared_config.make_session()
+
 
 def get_deployed_url():
     """Fetches the deployed worker URL."""
@@ -117,6 +177,66 @@ def get_deployed_url():
 
 
 
+# --- RESEARCH STATUS ---
+RESEARCH_TIMEOUT = 45
+
+def watch_research_events(base_url, session_id, headers, deadline):
+    """
+    Follows /api/research/{id}/events (SSE) until the task completes or fails.
+    Returns the final status, or None if the stream is unavailable (e.g. a
+    worker without the endpoint returns 404) so the caller can poll instead.
+    """
+    url = f"{base_url}/api/research/{session_id}/events"
+    try:
+        with SESSION.get(url, headers={**headers, "Accept": "text/event-stream"}, stream=True,
+                         timeout=(5, max(1, deadline - time.time()))) as res:
+            if res.status_code != 200 or not res.headers.get("Content-Type", "").startswith("text/event-stream"):
+                return None
+            for line in res.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event.get("type") == "error":
+                    print_fail(f"Event stream error: {event.get('message')}")
+                    return None
+                status = (event.get("data") or {}).get("status")
+                if status:
+                    print(f"  ... Status: {status}")
+                    if status in ("completed", "failed"):
+                        return status
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print_info(f"Event stream interrupted: {e}")
+    return None
+
+def poll_research_status(base_url, session_id, headers, deadline):
+    """Polls /api/research/{id} until completed/failed or deadline; returns the last status seen"""
+    # Exponential backoff with +/-25% jitter: quick to notice fast
+    # completions, few requests for slow ones. HTTP errors back off on
+    # their own, slower schedule.
+    delay = 0.25
+    error_delay = 1.0
+    status = None
+    while time.time() < deadline:
+        res = SESSION.get(f"{base_url}/api/research/{session_id}", headers=headers)
+        status_data = check_response(res)
+        
+        if status_data:
+            status = status_data.get("status", "unknown")
+            print(f"  ... Status: {status}")
+            if status in ("completed", "failed"):
+                return status
+            wait = delay
+            delay = min(delay * 1.8, 5.0)
+        else:
+            wait = error_delay
+            error_delay = min(error_delay * 2, 60.0)
+            delay = 0.25
+        
+        remaining = deadline - time.time()
+        time.sleep(max(0, min(wait * (0.75 + 0.5 * random.random()), remaining)))
+    return status
+
+
 # --- TEST SUITE ---
 def run_tests(base_url, headers):
     print_header(f"🚀 Starting Tests against {base_url}")
@@ -126,7 +246,7 @@ def run_tests(base_url, headers):
     print_info("Triggering Deep Health Check (/api/health/run)...")
     try:
         start = time.time()
-        res = requests.post(f"{base_url}/api/health/run", headers=headers)
+        res = SESSION.post(f"{base_url}/api/health/run", headers=headers)
         data = check_response(res)
         duration = time.time() - start
         
@@ -156,33 +276,25 @@ def run_tests(base_url, headers):
     }
     print_info(f"Dispatching Research Task: {payload['query']}")
     try:
-        res = requests.post(f"{base_url}/api/research", json=payload, headers=headers)
+        res = SESSION.post(f"{base_url}/api/research", json=payload, headers=headers)
         data = check_response(res)
         
         if data and "sessionId" in data:
             session_id = data["sessionId"]
             print_success(f"Task Queued! Session ID: {session_id}")
             
-            print_info("Polling for status (Timeout: 45s)...")
-            start_poll = time.time()
-            finished = False
-            while time.time() - start_poll < 45:
-                res = requests.get(f"{base_url}/api/research/{session_id}", headers=headers)
-                status_data = check_response(res)
-                
-                if status_data:
-                    status = status_data.get("status", "unknown")
-                    print(f"  ... Status: {status}")
-                    if status == "completed":
-                        print_success("Research Completed!")
-                        finished = True
-                        break
-                    elif status == "failed":
-                        print_fail("Research Failed.")
-                        finished = True
-                        break
-                time.sleep(2)
-            if not finished:
+            print_info(f"Waiting for status (Timeout: {RESEARCH_TIMEOUT}s)...")
+            deadline = time.time() + RESEARCH_TIMEOUT
+            status = watch_research_events(base_url, session_id, headers, deadline)
+            if status is None:
+                print_info("Event stream unavailable, polling for status...")
+                status = poll_research_status(base_url, session_id, headers, deadline)
+            
+            if status == "completed":
+                print_success("Research Completed!")
+            elif status == "failed":
+                print_fail("Research Failed.")
+            else:
                 print_fail("Polling timed out.")
         else:
             print_fail("Failed to dispatch research task.")
@@ -200,7 +312,7 @@ def run_tests(base_url, headers):
     }
     print_info("Dispatching Engineering Fix...")
     try:
-        res = requests.post(f"{base_url}/api/engineer/fix", json=payload, headers=headers)
+        res = SESSION.post(f"{base_url}/api/engineer/fix", json=payload, headers=headers)
         data = check_response(res)
         if data and data.get("status") == "queued":
             print_success(f"Engineer Agent Dispatched. Workflow ID: {data.get('id')}")
@@ -213,7 +325,7 @@ def run_tests(base_url, headers):
     print_header("Governance Workflow")
     print_info("Dispatching Documentation Sync...")
     try:
-        res = requests.post(f"{base_url}/api/governance/sync", json={"repoUrl": "https://github.com/example/repo"}, headers=headers)
+        res = SESSION.post(f"{base_url}/api/governance/sync", json={"repoUrl": "https://github.com/example/repo"}, headers=headers)
         data = check_response(res)
         if data and data.get("status") == "queued":
             print_success(f"Governance Sync Dispatched. Workflow ID: {data.get('id')}")
@@ -239,28 +351,18 @@ def main():
             
             # 2. Start Dev Server
             print_info(f"Starting 'wrangler dev' on port {LOCAL_PORT}...")
-            # We use bunx wrangler dev
+            # Pass the port explicitly so wrangler binds the port we cleared and probe
             dev_process = subprocess.Popen(
-                ["bunx", "wrangler", "dev"],
+                shared_config.wrangler_command() + ["dev", "--port", str(LOCAL_PORT)],
                 cwd=PROJECT_ROOT,
                 stdout=subprocess.DEVNULL, # Suppress stdout to keep test output clean
-                stderr=subprocess.PIPE     # Keep stderr for debug if needed
+                stderr=subprocess.PIPE,    # Keep stderr for debug if needed
+                start_new_session=True     # Own process group so cleanup reaches wrangler's children
             )
             
-            if not wait_for_server(LOCAL_URL, timeout=60):
+            if not wait_for_server(LOCAL_URL, timeout=60, process=dev_process):
                 print_fail("Could not start local server.")
-                if dev_process.poll() is not None:
-                    # Process exited
-                    stdout, stderr = dev_process.communicate()
-                    print_fail(f"Arguments: {dev_process.args}")
-                    if stderr:
-                         print_fail(f"STDERR:\n{stderr}")
-                else:
-                    # Start debug... kill it and read
-                    dev_process.terminate()
-                    stdout, stderr = dev_process.communicate()
-                    if stderr:
-                         print_fail(f"STDERR (Partial):\n{stderr}")
+                print_fail(f"Arguments: {dev_process.args}")
                 sys.exit(1)
             
             base_url = LOCAL_URL
@@ -282,9 +384,8 @@ def main():
         # Cleanup
         if dev_process:
             print_info("Stopping local dev server...")
-            dev_process.terminate()
-            dev_process.wait()
-            kill_port(LOCAL_PORT) # Double check
+            if not stop_process_group(dev_process):
+                kill_port(LOCAL_PORT) # Double check
 
 if __name__ == "__main__":
     main()
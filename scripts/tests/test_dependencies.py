@@ -3,53 +3,13 @@ import requests
 import sys
 import argparse
 import subprocess
-from pathlib import Path
+import asyncio
 import dev_server
+import shared_config
+from shared_config import load_env_vars, load_wrangler_vars
 
-def load_env_vars():
-    """Load env vars from .dev.vars"""
-    env_vars = {}
-    dev_vars_path = Path(".dev.vars")
-    
-    if not dev_vars_path.exists():
-        print("❌ .dev.vars file not found!")
-        return env_vars
-
-    try:
-        with open(dev_vars_path, "r") as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    value = value.strip().strip("'").strip('"')
-                    env_vars[key] = value
-    except Exception as e:
-        print(f"❌ Error reading .dev.vars: {e}")
-        
-    return env_vars
-
-def load_wrangler_vars():
-    """Load vars section from wrangler.toml"""
-    wrangler_vars = {}
-    try:
-        with open("wrangler.toml", "r") as f:
-            in_vars = False
-            for line in f:
-                line = line.strip()
-                if line == "[vars]":
-                    in_vars = True
-                    continue
-                elif line.startswith("[") and in_vars:
-                    break
-                
-                if in_vars and "=" in line:
-                    key, value = line.split("=", 1)
-                    key = key.strip()
-                    value = value.strip().strip("'").strip('"')
-                    wrangler_vars[key] = value
-    except FileNotFoundError:
-        pass
-    return wrangler_vars
+# Keep-alive connections shared by every probe
+SESSION = shared_config.make_session()
 
 def test_github_connection(token):
     print("\n🔍 Testing GitHub Connection...")
@@ -64,7 +24,7 @@ def test_github_connection(token):
     }
     
     try:
-        response = requests.get("https://api.github.com/user", headers=headers)
+        response = SESSION.get("https://api.github.com/user", headers=headers)
         if response.status_code == 200:
             user = response.json()
             print(f"✅ GitHub Connection Successful! Authenticated as: {user.get('login')}")
@@ -94,7 +54,7 @@ def test_worker_ai_connection(account_id, token):
     
     try:
         url = "https://api.cloudflare.com/client/v4/user/tokens/verify"
-        response = requests.get(url, headers=headers)
+        response = SESSION.get(url, headers=headers)
         
         if response.status_code == 200:
              data = response.json()
@@ -120,7 +80,7 @@ def test_upstream_mcp_status(worker_url):
         mcp_check_url = f"{worker_url}/api/health/mcp"
         print(f"   Hitting: {mcp_check_url}")
         
-        response = requests.post(mcp_check_url)
+        response = SESSION.post(mcp_check_url)
         
         if response.status_code == 200:
             data = response.json()
@@ -186,6 +146,8 @@ def main():
     print("🚀 Starting Dependency & Connectivity Check...")
     print("-" * 40)
     
+    if not os.path.exists(".dev.vars"):
+        print("❌ .dev.vars file not found!")
     env_vars = load_env_vars()
     wrangler_vars = load_wrangler_vars()
     
@@ -203,17 +165,20 @@ def main():
             print(f"❌ Failed to start local server: {e}")
             sys.exit(1)
 
-    # 1. GitHub Check
     gh_token = env_vars.get("GITHUB_TOKEN")
-    gh_ok = test_github_connection(gh_token)
-    
-    # 2. AI Gateway / Cloudflare Check
     cf_account = env_vars.get("CLOUDFLARE_ACCOUNT_ID")
     cf_token = env_vars.get("CF_AIG_TOKEN")
-    ai_ok = test_worker_ai_connection(cf_account, cf_token)
-    
-    # 3. Upstream MCP Server Check (via Worker)
-    mcp_ok = test_upstream_mcp_status(worker_url)
+
+    # 1-3. GitHub, AI Gateway / Cloudflare and Upstream MCP (via Worker) checks are
+    # independent network round-trips, so run them in parallel and print in order
+    probes = [
+        (test_github_connection, (gh_token,)),
+        (test_worker_ai_connection, (cf_account, cf_token)),
+        (test_upstream_mcp_status, (worker_url,)),
+    ]
+    gh_ok, ai_ok, mcp_ok = asyncio.run(shared_config.gather_in_order(
+        asyncio.to_thread(probe, *probe_args) for probe, probe_args in probes
+    ))
     
     # 4. Deployment Check (Optional)
     deploy_ok = True
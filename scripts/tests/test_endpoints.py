@@ -1,75 +1,145 @@
-import requests
 import json
 import os
 import sys
 import time
 import argparse
+import asyncio
+import httpx
+from urllib.parse import urlencode
 import dev_server
 import shared_config
-
-# Configuration
-def load_env_vars():
-    """Load env vars from .dev.vars"""
-    env_vars = {}
-    try:
-        with open(".dev.vars", "r") as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#") and "=" in line:
-                    key, value = line.split("=", 1)
-                    value = value.strip("'").strip('"')
-                    env_vars[key] = value
-    except FileNotFoundError:
-        pass
-    return env_vars
-
-def load_wrangler_vars():
-    """Load vars section from wrangler.toml"""
-    wrangler_vars = {}
-    try:
-        with open("wrangler.toml", "r") as f:
-            in_vars = False
-            for line in f:
-                line = line.strip()
-                if line == "[vars]":
-                    in_vars = True
-                    continue
-                elif line.startswith("[") and in_vars:
-                    break
-                
-                if in_vars and "=" in line:
-                    key, value = line.split("=", 1)
-                    key = key.strip()
-                    value = value.strip().strip("'").strip('"')
-                    wrangler_vars[key] = value
-    except FileNotFoundError:
-        pass
-    return wrangler_vars
+from shared_config import load_env_vars, load_wrangler_vars
 
 # Load config
 DEV_VARS = load_env_vars()
 WRANGLER_VARS = load_wrangler_vars()
 
+# Auth headers sent with every request, resolved once
+API_KEY = DEV_VARS.get("WORKER_API_KEY") or WRANGLER_VARS.get("WORKER_API_KEY")
+BASE_HEADERS = {"x-api-key": API_KEY} if API_KEY and API_KEY != "(hidden)" else {}
+
+_STREAM_QUERY = urlencode({"stream": "true"})
+
+# Per-request timeout; question endpoints wait on AI providers
+REQUEST_TIMEOUT = 120
+
 EXAMPLES_DIR = "examples"
 
+# Limits for unpacking JSON embedded in string fields of responses
+MAX_PARSE_DEPTH = 6
+MAX_EMBEDDED_JSON_SIZE = 64 * 1024
+
+# Lines of JSON shown for responses unless allow_large_output is set
+PREVIEW_LINES = 50
+# Values kept from a response before building its preview
+PREVIEW_ITEMS = 500
+
 def print_separator():
     print("-" * 60)
 
+def _parse_examples(directory):
+    """Parses every examples/*.json up front, so bad JSON shows up before any request is sent"""
+    examples = {}
+    if not os.path.isdir(directory):
+        return examples
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json") and entry.is_file():
+            with open(entry.path, "r") as f:
+                examples[entry.name] = json.load(f)
+    return examples
+
+_EXAMPLES = _parse_examples(EXAMPLES_DIR)
+
 def load_example(filename):
-    filepath = os.path.join(EXAMPLES_DIR, filename)
-    if not os.path.exists(filepath):
-        print(f"Error: File not found: {filepath}")
+    if filename not in _EXAMPLES:
+        print(f"Error: File not found: {os.path.join(EXAMPLES_DIR, filename)}")
         sys.exit(1)
-    with open(filepath, "r") as f:
-        return json.load(f)
+    return _EXAMPLES[filename]
+
+def recursive_json_parse(obj, depth=0):
+    """
+    Returns a copy of obj with string fields that contain JSON objects/lists
+    (e.g. stored results) parsed; obj itself is left untouched.
+    """
+    if depth >= MAX_PARSE_DEPTH:
+        return obj
+    if isinstance(obj, dict):
+        return {k: recursive_json_parse(v, depth + 1) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [recursive_json_parse(v, depth + 1) for v in obj]
+    if isinstance(obj, str):
+        # We only want to parse objects/lists, not simple strings like "success",
+        # and skip huge blobs that would cost a full extra parse
+        if len(obj) > MAX_EMBEDDED_JSON_SIZE:
+            return obj
+        if (obj[:1] == '{' and obj[-1:] == '}') or (obj[:1] == '[' and obj[-1:] == ']'):
+            try:
+                return recursive_json_parse(json.loads(obj), depth + 1)
+            except ValueError:
+                pass
+    return obj
 
-def test_endpoint(base_url, method, endpoint, payload=None, description="", stream=True, allow_large_output=False):
+def truncate_for_preview(obj, max_items):
+    """
+    Returns a copy of obj holding at most max_items values in total; the
+    containers that hit the limit end with a truncation marker. Keeps huge
+    responses from being walked and parsed in full just to preview them.
+    """
+    remaining = max_items
+
+    def walk(o):
+        nonlocal remaining
+        remaining -= 1
+        if isinstance(o, dict):
+            out = {}
+            for k, v in o.items():
+                if remaining <= 0:
+                    out["…"] = "(truncated)"
+                    break
+                out[k] = walk(v)
+            return out
+        if isinstance(o, list):
+            out = []
+            for v in o:
+                if remaining <= 0:
+                    out.append("… (truncated)")
+                    break
+                out.append(walk(v))
+            return out
+        return o
+
+    return walk(obj)
+
+def json_preview(obj, max_lines):
+    """
+    Returns (text, truncated) with the first max_lines of obj as indented JSON.
+    Encodes incrementally and stops once enough lines exist, so large
+    responses are never fully serialized just to show their head.
+    """
+    chunks = []
+    newlines = 0
+    for chunk in json.JSONEncoder(indent=2).iterencode(obj):
+        chunks.append(chunk)
+        newlines += chunk.count("\n")
+        if newlines >= max_lines:
+            # Cut at the max_lines-th newline without splitting into line strings
+            text = "".join(chunks)
+            end = -1
+            for _ in range(max_lines):
+                end = text.index("\n", end + 1)
+            return text[:end], True
+    return "".join(chunks), False
+
+def _mk_url(base_url, endpoint, stream):
+    """Builds the request URL, adding stream=true for streaming requests"""
+    if not stream:
+        return f"{base_url}{endpoint}"
+    separator = "&" if "?" in endpoint else "?"
+    return f"{base_url}{endpoint}{separator}{_STREAM_QUERY}"
+
+async def test_endpoint(client, base_url, method, endpoint, payload=None, description="", stream=True, allow_large_output=False):
     # Add stream parameter to URL if it's a POST request (where our API supports it)
-    if stream and method == "POST":
-        separator = "&" if "?" in endpoint else "?"
-        url = f"{base_url}{endpoint}{separator}stream=true"
-    else:
-        url = f"{base_url}{endpoint}"
+    url = _mk_url(base_url, endpoint, stream and method == "POST")
 
     print_separator()
     print(f"Testing: {description}")
@@ -78,80 +148,54 @@ def test_endpoint(base_url, method, endpoint, payload=None, description="", stre
     
     try:
         start_time = time.time()
-        
-        headers = {}
-        api_key = DEV_VARS.get("WORKER_API_KEY", WRANGLER_VARS.get("WORKER_API_KEY"))
-        if api_key and api_key != "(hidden)":
-             headers["x-api-key"] = api_key
-
-        if method == "GET":
-            response = requests.get(url, headers=headers)
-        elif method == "POST":
-            response = requests.post(url, json=payload, headers=headers, stream=stream and method == "POST")
-        else:
+
+        if method not in ("GET", "POST"):
             print(f"Unsupported method: {method}")
             return None
 
-        print(f"Status Code: {response.status_code}")
-        
         if stream and method == "POST":
-            print("--- Streaming Output ---")
-            content_buffer = []
-            for line in response.iter_lines():
-                if line:
-                    decoded_line = line.decode('utf-8')
-                    print(decoded_line)
-                    content_buffer.append(decoded_line)
+            async with client.stream(method, url, json=payload) as response:
+                print(f"Status Code: {response.status_code}")
+                print("--- Streaming Output ---")
+                # Read in 64 KiB chunks and decode the body once at the end
+                body = bytearray()
+                async for chunk in response.aiter_bytes(65536):
+                    body += chunk
+            content_buffer = [line for line in body.decode('utf-8', 'replace').splitlines() if line]
+            print("\n".join(content_buffer))
             
             duration = time.time() - start_time
             print(f"\nTime: {duration:.2f}s")
             return content_buffer
-        else:
-            duration = time.time() - start_time
-            print(f"Time: {duration:.2f}s")
-            try:
-                data = response.json()
-                
-                # Helper to recursively parse JSON strings
-                def recursive_json_parse(obj):
-                    if isinstance(obj, dict):
-                        for k, v in obj.items():
-                            obj[k] = recursive_json_parse(v)
-                    elif isinstance(obj, list):
-                        for i in range(len(obj)):
-                            obj[i] = recursive_json_parse(obj[i])
-                    elif isinstance(obj, str):
-                        try:
-                            # Try to parse string as JSON
-                            # We only want to parse objects/lists, not simple strings like "success"
-                            if (obj.strip().startswith('{') and obj.strip().endswith('}')) or \
-                               (obj.strip().startswith('[') and obj.strip().endswith(']')):
-                                parsed = json.loads(obj)
-                                return recursive_json_parse(parsed)
-                        except (json.JSONDecodeError, TypeError):
-                            pass
-                    return obj
-
-                # Clean up data for display
-                display_data = recursive_json_parse(data.copy() if isinstance(data, dict) else data)
-
-                # Print first few lines of JSON to avoid spamming
-                json_str = json.dumps(display_data, indent=2)
-                lines = json_str.split("\n")
-                if len(lines) > 50 and not allow_large_output: # Allow more lines for health check or if requested
-                    print("\nResponse Preview:")
-                    print("\n".join(lines[:50]))
-                    print(f"... ({len(lines) - 50} more lines) ...")
-                else:
-                    print("\nResponse:")
-                    print(json_str)
-                return data
-            except ValueError:
-                print("\nResponse (Text):")
-                print(response.text[:500])
-                return response.text
 
-    except requests.exceptions.ConnectionError:
+        response = await client.request(method, url, json=payload)
+        print(f"Status Code: {response.status_code}")
+        
+        duration = time.time() - start_time
+        print(f"Time: {duration:.2f}s")
+        try:
+            data = response.json()
+
+            # Clean up data for display
+            display_data = recursive_json_parse(data if allow_large_output else truncate_for_preview(data, PREVIEW_ITEMS))
+
+            # Print first few lines of JSON to avoid spamming
+            if allow_large_output: # Allow more lines for health check or if requested
+                print("\nResponse:")
+                print(json.dumps(display_data, indent=2))
+            else:
+                preview, truncated = json_preview(display_data, PREVIEW_LINES)
+                print("\nResponse Preview:" if truncated else "\nResponse:")
+                print(preview)
+                if truncated:
+                    print("... (more lines) ...")
+            return data
+        except ValueError:
+            print("\nResponse (Text):")
+            print(response.text[:500])
+            return response.text
+
+    except httpx.ConnectError:
         print(f"\nError: Could not connect to {base_url}")
         print("Make sure the worker is running (e.g., 'npm start' or 'wrangler dev')")
         return None
@@ -159,6 +203,65 @@ def test_endpoint(base_url, method, endpoint, payload=None, description="", stre
         print(f"\nError: {str(e)}")
         return None
 
+async def run_tests(client, base_url, specs):
+    """
+    Runs (method, endpoint, kwargs) specs concurrently over one shared client.
+    Output is printed in spec order once all of them have finished.
+    Returns the results in the same order.
+    """
+    return await shared_config.gather_in_order(
+        test_endpoint(client, base_url, method, endpoint, **kwargs) for method, endpoint, kwargs in specs
+    )
+
+async def run_suite(base_url, health_only):
+    # 0. Health Check (Root) - Latest + Instructions
+    # 1. Health Check (Latest) - GET doesn't stream
+    specs = [
+        ("GET", "/api/health", dict(description="Get Health Root (Latest + Instructions)", stream=False, allow_large_output=True)),
+        ("GET", "/api/health/latest", dict(description="Get Latest Health Check (Raw)", stream=False, allow_large_output=health_only)),
+    ]
+
+    async with httpx.AsyncClient(http2=shared_config.HTTP2_ENABLED, timeout=REQUEST_TIMEOUT, headers=BASE_HEADERS) as client:
+        # 2. Run Health Check (Manual) - Supports streaming
+        if health_only:
+            print("\nSkipping other tests (Health check only requested).")
+            specs.append(("POST", "/api/health/run", dict(description="Run Manual Health Check", allow_large_output=True)))
+            await run_tests(client, base_url, specs)
+            return
+
+        specs += [
+            # 2. Run Health Check (Manual) - Supports streaming
+            ("POST", "/api/health/run", dict(description="Run Manual Health Check")),
+            # 3. Simple Questions
+            ("POST", "/api/questions/simple", dict(payload=load_example("simple-questions.json"), description="Simple Questions (Default/Worker AI)")),
+            # 3b. Simple Questions (Gemini)
+            ("POST", "/api/questions/simple", dict(payload={
+                "questions": ["What is Cloudflare Workers AI?"],
+                "use_gemini": True
+            }, description="Simple Question (Google Gemini)")),
+            # 4. Detailed Questions
+            ("POST", "/api/questions/detailed", dict(payload=load_example("detailed-questions.json"), description="Detailed Questions")),
+            # 5. Auto Analyze
+            ("POST", "/api/questions/auto-analyze", dict(payload=load_example("auto-analyze.json"), description="Auto Analyze Repository")),
+            # 6. List Sessions
+            ("GET", "/api/sessions", dict(description="List Sessions", stream=False)),
+        ]
+        # Independent tests run concurrently; session details need the session list
+        sessions_data = (await run_tests(client, base_url, specs))[-1]
+
+        # 7. Get Session Details
+        if isinstance(sessions_data, dict) and sessions_data.get("sessions"):
+            session_id = sessions_data["sessions"][0]["sessionId"]
+            await run_tests(client, base_url, [
+                ("GET", f"/api/sessions/{session_id}", dict(description=f"Get Session Details ({session_id})", stream=False)),
+            ])
+        else:
+            print_separator()
+            print("Skipping Session Details test (no sessions found)")
+
+    print_separator()
+    print("Tests Completed.")
+
 def main():
     parser = argparse.ArgumentParser(description="Test API endpoints.")
     parser.add_argument("--local", action="store_true", help="Start local dev server if not running")
@@ -185,55 +288,7 @@ def main():
         sys.exit(1)
 
     print(f"Starting API Tests against {base_url}")
-    
-    # 0. Health Check (Root) - Latest + Instructions
-    test_endpoint(base_url, "GET", "/api/health", description="Get Health Root (Latest + Instructions)", stream=False, allow_large_output=True)
-
-    # 1. Health Check (Latest) - GET doesn't stream
-    test_endpoint(base_url, "GET", "/api/health/latest", description="Get Latest Health Check (Raw)", stream=False, allow_large_output=args.health)
-
-    # 2. Run Health Check (Manual) - Supports streaming
-    if args.health:
-        print("\nSkipping other tests (Health check only requested).")
-        test_endpoint(base_url, "POST", "/api/health/run", description="Run Manual Health Check", allow_large_output=True)
-        return
-
-    # 2. Run Health Check (Manual) - Supports streaming
-    test_endpoint(base_url, "POST", "/api/health/run", description="Run Manual Health Check")
-
-    # 3. Simple Questions
-    simple_payload = load_example("simple-questions.json")
-    test_endpoint(base_url, "POST", "/api/questions/simple", payload=simple_payload, description="Simple Questions (Default/Worker AI)")
-
-    # 3b. Simple Questions (Gemini)
-    print("\nAdding Gemini Test Case...")
-    gemini_payload = {
-        "questions": ["What is Cloudflare Workers AI?"],
-        "use_gemini": True
-    }
-    test_endpoint(base_url, "POST", "/api/questions/simple", payload=gemini_payload, description="Simple Question (Google Gemini)")
-
-    # 4. Detailed Questions
-    detailed_payload = load_example("detailed-questions.json")
-    test_endpoint(base_url, "POST", "/api/questions/detailed", payload=detailed_payload, description="Detailed Questions")
-
-    # 5. Auto Analyze
-    auto_analyze_payload = load_example("auto-analyze.json")
-    test_endpoint(base_url, "POST", "/api/questions/auto-analyze", payload=auto_analyze_payload, description="Auto Analyze Repository")
-
-    # 6. List Sessions
-    sessions_data = test_endpoint(base_url, "GET", "/api/sessions", description="List Sessions", stream=False)
-
-    # 7. Get Session Details
-    if sessions_data and "sessions" in sessions_data and len(sessions_data["sessions"]) > 0:
-        session_id = sessions_data["sessions"][0]["sessionId"]
-        test_endpoint(base_url, "GET", f"/api/sessions/{session_id}", description=f"Get Session Details ({session_id})", stream=False)
-    else:
-        print_separator()
-        print("Skipping Session Details test (no sessions found)")
-
-    print_separator()
-    print("Tests Completed.")
+    asyncio.run(run_suite(base_url, args.health))
 
 if __name__ == "__main__":
     main()
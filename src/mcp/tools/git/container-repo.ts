@@ -110,7 +110,7 @@ export class RepoAnalyzerContainer {
   async getFilesContent(
     filePaths: string[],
     maxSize: number = 8000
-  ): Promise<Array<{ path: string; content: string; error?: string }>> {
+  ): Promise<Array<{ path: string; content: string; error?: string; binary?: boolean; size?: number }>> {
     const response = await this.fetch('/analyze', {
       method: 'POST',
       headers: {
@@ -129,8 +129,27 @@ export class RepoAnalyzerContainer {
       throw new Error(`Failed to analyze files: ${error.error || response.statusText}`);
     }
 
-    const data = await response.json() as any;
-    return data.files || [];
+    // Response is NDJSON: one file result per line, in request order
+    const files: Array<{ path: string; content: string; error?: string; binary?: boolean; size?: number }> = [];
+    if (!response.body) {
+      return files;
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffered = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += value;
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (line) files.push(JSON.parse(line));
+      }
+    }
+    if (buffered) files.push(JSON.parse(buffered));
+
+    return files;
   }
 
   /**
@@ -688,6 +688,91 @@ app.openapi(researchStatusRoute, async (c) => {
   return c.json(result as any, 200);
 });
 
+// Upper bound on how long a research event stream stays open
+const RESEARCH_EVENTS_MAX_MS = 5 * 60 * 1000;
+
+const researchEventsRoute = createRoute({
+  method: "get",
+  path: "/research/{sessionId}/events",
+  operationId: "streamResearchStatus",
+  tags: ["Questions"],
+  summary: "Stream Deep Research task status",
+  description: "Server-Sent Events stream that emits the task status whenever it changes and closes once the task completes or fails",
+  parameters: [
+    {
+      name: "sessionId",
+      in: "path",
+      required: true,
+      schema: { type: "string" },
+    },
+  ],
+  responses: {
+    200: {
+      description: "Task status events",
+      content: {
+        "text/event-stream": { schema: z.string() }
+      },
+    },
+    404: {
+      description: "Session not found",
+    },
+  },
+});
+
+app.openapi(researchEventsRoute, async (c) => {
+  const sessionId = c.req.param("sessionId");
+  const key = `research:${sessionId}`;
+  const initial = await c.env.QUESTIONS_KV.get(key, "json");
+
+  if (!initial) {
+    return c.json({ error: "Session not found" }, 404);
+  }
+
+  const sse = createSSEStream();
+  const signal = c.req.raw.signal;
+
+  (async () => {
+    try {
+      // Watch KV inside the worker so the client holds one connection instead of polling
+      let current: any = initial;
+      let lastStatus: string | undefined;
+      let delay = 500;
+      const deadline = Date.now() + RESEARCH_EVENTS_MAX_MS;
+
+      while (!signal.aborted) {
+        if (current && current.status !== lastStatus) {
+          lastStatus = current.status;
+          sse.sendData(current, `Status: ${lastStatus}`);
+          if (lastStatus === 'completed' || lastStatus === 'failed') break;
+          delay = 500;
+        }
+        if (Date.now() >= deadline) {
+          sse.sendError("Timed out waiting for research task");
+          break;
+        }
+        await new Promise((resolve) => setTimeout(resolve, delay));
+        delay = Math.min(delay * 1.5, 5000);
+        current = await c.env.QUESTIONS_KV.get(key, "json");
+      }
+      sse.complete();
+    } catch (error) {
+      // Client disconnects surface here as enqueue errors on the closed stream
+      if (signal.aborted) return;
+      console.error("Error in research event stream:", error);
+      try {
+        sse.sendError(error as Error);
+        sse.complete();
+      } catch {
+        // Stream already closed
+      }
+    }
+  })();
+
+  return new Response(sse.stream, {
+    headers: getSSEHeaders(),
+  }) as any;
+});
+
 /**
  * Engineer Endpoint - Fix Code
  */